@@ -1,14 +1,11 @@
-import copy, math, random, torch
+import math, torch
 import torch.nn as nn
+from torch import Tensor
+from typing import Optional, Tuple
 from collections import namedtuple
 
 
 
-def clones(module, N):
-    return nn.ModuleList([copy.deepcopy(module) for _ in range(N)])
-
-
-
 class PositionalEncoding(nn.Module):
     def __init__(self, config):
         super(PositionalEncoding, self).__init__()
@@ -26,10 +23,11 @@ class PositionalEncoding(nn.Module):
         pe = pe.unsqueeze(0)
 
         self.register_buffer('pe', pe)
-        
+
 
     def forward(self, x):
-        return x + self.pe[:, :x.size(1)]
+        #x is a fresh tensor from the embedding scale, so add in-place
+        return x.add_(self.pe[:, :x.size(1)])
 
 
 
@@ -43,26 +41,23 @@ class Embeddings(nn.Module):
         self.pos_emb = PositionalEncoding(config)
         self.pos_dropout = nn.Dropout(config.dropout_ratio)
 
-        self.use_fc_layer = (config.emb_dim != config.hidden_dim)
-        if self.use_fc_layer:
+        if config.emb_dim != config.hidden_dim:
             self.fc = nn.Linear(config.emb_dim, config.hidden_dim)
             self.fc_dropout = nn.Dropout(config.dropout_ratio)
+        else:
+            self.fc = nn.Identity()
+            self.fc_dropout = nn.Identity()
 
 
     def forward(self, x):
-        out = self.tok_emb(x) * self.scale
+        out = self.tok_emb(x).mul_(self.scale)
         out = self.pos_dropout(self.pos_emb(out))
-
-        if not self.use_fc_layer:
-            return out
         return self.fc_dropout(self.fc(out))
 
 
 
-class Encoder(nn.Module):
+class Encoder(nn.TransformerEncoder):
     def __init__(self, config):
-        super(Encoder, self).__init__()
-
         layer = nn.TransformerEncoderLayer(
             d_model=config.hidden_dim,
             nhead=config.n_heads,
@@ -72,25 +67,23 @@ class Encoder(nn.Module):
             batch_first=True
         )
 
-        self.layers = clones(layer, config.n_layers)
+        super(Encoder, self).__init__(layer, config.n_layers)
 
 
     def forward(self, x, e_mask):
-        for layer in self.layers:
-            x = layer(x, src_key_padding_mask=e_mask)
-        return x
+        return super().forward(x, src_key_padding_mask=e_mask)
 
 
 
 class DecoderLayer(nn.TransformerDecoderLayer):
     def forward(
         self,
-        x,
-        memory=None,
-        e_mask=None,
-        d_mask=None,
-        use_cache=False
-    ):
+        x: Tensor,
+        memory: Optional[Tensor] = None,
+        e_mask: Optional[Tensor] = None,
+        d_mask: Optional[Tensor] = None,
+        use_cache: bool = False
+    ) -> Tensor:
 
         if not use_cache:
             return super().forward(
@@ -104,7 +97,9 @@ class DecoderLayer(nn.TransformerDecoderLayer):
         last_token = x[:, -1:, :]
 
         # self attention part
-        _x = self.self_attn(last_token, x, x)[0]
+        #need_weights=False dispatches to scaled_dot_product_attention,
+        #which skips materializing the attention weight matrix
+        _x = self.self_attn(last_token, x, x, need_weights=False)[0]
 
         last_token = last_token + self.dropout1(_x)
         last_token = self.norm1(last_token)
@@ -114,6 +109,7 @@ class DecoderLayer(nn.TransformerDecoderLayer):
         _x = self.multihead_attn(
             last_token, memory, memory,
             key_padding_mask=e_mask,
+            need_weights=False
         )[0]
 
         last_token = last_token + self.dropout2(_x)
@@ -133,13 +129,13 @@ class Decoder(nn.TransformerDecoder):
 
     def forward(
         self,
-        x,
-        memory=None,
-        cache=None,
-        e_mask=None,
-        d_mask=None,
-        use_cache=True
-    ):
+        x: Tensor,
+        memory: Optional[Tensor] = None,
+        cache: Optional[Tensor] = None,
+        e_mask: Optional[Tensor] = None,
+        d_mask: Optional[Tensor] = None,
+        use_cache: bool = True
+    ) -> Tuple[Tensor, Optional[Tensor]]:
 
         output = x
 
@@ -152,7 +148,7 @@ class Decoder(nn.TransformerDecoder):
         #In case of using Cache
         new_token_cache = []
         for idx, layer in enumerate(self.layers):
-            output = layer(output, memory, use_cache=True)
+            output = layer(output, memory, e_mask=e_mask, use_cache=True)
             new_token_cache.append(output)
             
             if cache is not None:  
@@ -184,7 +180,7 @@ class ModelBase(nn.Module):
         self.sampling_ratio = config.sampling_ratio
 
         self.out = namedtuple('Out', 'logit loss')
-        self.criterion = nn.CrossEntropyLoss()
+        self.criterion = nn.CrossEntropyLoss(ignore_index=self.pad_id)
 
 
     def auxiliary_loss(self, y, memory, e_mask, loss):
@@ -205,19 +201,15 @@ class ModelBase(nn.Module):
 
 
     def recurrent_loss(self, logit, y, label, memory, e_mask):
-        bs, seq_len = y.shape
+        seq_len = y.size(1)
         pred = logit.argmax(dim=-1)
 
-        sampled = torch.empty(bs, seq_len, dtype=torch.long)
-        sampled = sampled.fill_(self.pad_id).to(self.device)
+        #draw one coin per timestep and pick gold/pred in a single kernel
+        use_gold = torch.rand(seq_len, device=self.device) < self.sampling_ratio
+        sampled = torch.where(use_gold, y, pred)
         sampled[:, 0] = self.bos_id
 
-        for t in range(1, seq_len):
-            if random.random() < self.sampling_ratio:
-                sampled[:, t] = y[:, t]
-            else:
-                sampled[:, t] = pred[:, t]
-        
+
         d_mask = self.dec_mask(sampled)
         dec_out, _ = self.decode(sampled, memory, None, e_mask, d_mask)
         logit = self.generator(dec_out)
@@ -241,21 +233,18 @@ class ModelBase(nn.Module):
         dec_out, _ = self.decode(y, memory, None, e_mask, d_mask, use_cache=False)
         logit = self.generator(dec_out)
 
-        self.out.logit = logit
         loss = self.criterion(
-            logit.contiguous().view(-1, self.vocab_size), 
+            logit.contiguous().view(-1, self.vocab_size),
             label.contiguous().view(-1)
-        ) if self.strategy != 'sampling' else None
+        ) if self.strategy != 'recurrent' else None
 
-        #Getting Loss Process             
+        #Getting Loss Process
         if self.strategy == 'auxiliary':
-            self.out.loss = self.auxiliary_loss(y, memory, e_mask, loss)
-        elif self.strategy == 'sampling':
-            self.out.loss = self.sampling_loss(logit, y, label, memory, e_mask)
-        else:
-            self.out.loss = loss
-            
-        return self.out
+            loss = self.auxiliary_loss(y, memory, e_mask, loss)
+        elif self.strategy == 'recurrent':
+            loss = self.recurrent_loss(logit, y, label, memory, e_mask)
+
+        return self.out(logit=logit, loss=loss)
 
 
 
@@ -264,9 +253,14 @@ class ModelBase(nn.Module):
         _, label = self.shift_y(y)
         batch_size, output_len = label.shape
         
-        pred = torch.zeros((batch_size, 1), dtype=torch.long)
-        pred = pred.fill_(self.bos_id).to(self.device)
-        logit = torch.empty(batch_size, output_len, self.vocab_size).to(self.device)
+        pred = torch.full(
+            (batch_size, output_len+1), self.pad_id,
+            dtype=torch.long, device=self.device
+        )
+        pred[:, 0] = self.bos_id
+        logit = torch.empty(
+            batch_size, output_len, self.vocab_size, device=self.device
+        )
 
         cache = None
         e_mask = self.pad_mask(x)
@@ -280,15 +274,14 @@ class ModelBase(nn.Module):
             curr_pred = curr_logit.argmax(dim=-1)
 
             logit[:, idx-1:idx, :] = curr_logit
-            pred = torch.cat([pred, curr_pred], dim=1)
+            pred[:, idx:idx+1] = curr_pred
         
-        self.out.logit = logit
-        self.out.loss = self.criterion(
-            logit.contiguous().view(-1, self.vocab_size), 
+        loss = self.criterion(
+            logit.contiguous().view(-1, self.vocab_size),
             label.contiguous().view(-1)
-        )        
+        )
 
-        return self.out
+        return self.out(logit=logit, loss=loss)
 
 
 
@@ -312,6 +305,20 @@ class Transformer(ModelBase):
 
         self.generator = nn.Linear(config.hidden_dim, self.vocab_size)
 
+        #share one vocab-sized table across both embeddings and the generator
+        if config.tie_embeddings and config.emb_dim == config.hidden_dim:
+            self.dec_emb.tok_emb.weight = self.enc_emb.tok_emb.weight
+            self.generator.weight = self.enc_emb.tok_emb.weight
+
+        self.register_buffer(
+            'causal_mask',
+            torch.triu(
+                torch.full((self.max_len, self.max_len), float('-inf')),
+                diagonal=1
+            ),
+            persistent=False
+        )
+
 
     @staticmethod
     def shift_y(y):
@@ -319,12 +326,12 @@ class Transformer(ModelBase):
 
 
     def pad_mask(self, x):
-        return x == self.pad_id
+        return x.eq(self.pad_id)
 
 
     def dec_mask(self, x):
         sz = x.size(1)
-        return torch.triu(torch.full((sz, sz), float('-inf')), diagonal=1).to(self.device)
+        return self.causal_mask[:sz, :sz]
 
 
     def encode(self, x, x_mask):
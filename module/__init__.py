@@ -0,0 +1,5 @@
+from .data import load_dataloader
+from .model import load_model
+from .train import Trainer
+from .test import Tester
+from .generate import Generator
@@ -1,4 +1,5 @@
 import json, torch
+import torch.nn.functional as F
 from torch.utils.data import DataLoader
 from torch.nn.utils.rnn import pad_sequence
 
@@ -44,12 +45,20 @@ class Collator(object):
 
 
     def pad_batch(self, batch):
-        return pad_sequence(
-            batch, 
-            batch_first=True, 
+        padded = pad_sequence(
+            batch,
+            batch_first=True,
             padding_value=self.pad_id
         )
 
+        #bucket batch lengths to multiples of 8 so the compiled forward
+        #sees few distinct shapes and GEMM dims stay tensor-core aligned
+        pad_len = -padded.size(1) % 8
+        if pad_len:
+            padded = F.pad(padded, (0, pad_len), value=self.pad_id)
+
+        return padded
+
 
 
 def load_dataloader(config, tokenizer, split):
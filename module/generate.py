@@ -46,9 +46,9 @@ class Generator:
             
 
 
-    def generate(self, input_seq, search_method):
-        
-        input_tensor = self.tokenizer.encode(input_tensor).ids    
+    def generate(self, input_seq):
+
+        input_tensor = self.tokenizer.encode(input_seq).ids
         input_tensor = torch.LongTensor([input_tensor]).to(self.device)
 
         with torch.no_grad():
@@ -64,15 +64,16 @@ class Generator:
     def greedy_search(self, input_tensor):
         output = torch.LongTensor([[self.bos_id]]).to(self.device)
 
+        cache = None
         e_mask = self.model.pad_mask(input_tensor)
-        memory = self.model.encoder(input_tensor, e_mask)        
+        memory = self.model.encode(input_tensor, e_mask)
+
 
-        
         for i in range(1, self.max_len):
-            dec_out = self.model.decoder(output, memory, e_mask, None)            
-            logit = self.model.generator(dec_out)
-            
-            next_token = logit[:, -1].argmax(-1).unsqueeze(0)
+            dec_out, cache = self.model.decode(output, memory, cache, e_mask, use_cache=True)
+            logit = self.model.generator(dec_out[:, -1])
+
+            next_token = logit.argmax(-1).unsqueeze(0)
             output = torch.cat([output, next_token], dim=1)
 
             if next_token == self.eos_id:
@@ -127,7 +128,7 @@ class Generator:
         Node, nodes, end_nodes = self.init_nodes()
 
         e_mask = self.model.pad_mask(input_tensor)
-        memory = self.model.encoder(input_tensor, e_mask)
+        memory = self.model.encode(input_tensor, e_mask)
 
         for t in range(self.max_len):
             curr_nodes = [nodes.get() for _ in range(self.beam_size)]
@@ -139,8 +140,9 @@ class Generator:
 
                 d_input = torch.LongTensor([curr_node.pred]).to(self.device)
 
-                d_out = self.model.decoder(d_input, memory, e_mask, None)                                           
-                out = self.model.generator(d_out)[:, -1]
+                d_mask = self.model.dec_mask(d_input)
+                d_out, _ = self.model.decode(d_input, memory, None, e_mask, d_mask, use_cache=False)
+                out = self.model.generator(d_out[:, -1])
                 
                 logits, preds = torch.topk(out, self.beam_size)
                 log_probs = torch.log_softmax(logits, dim=-1)
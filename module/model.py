@@ -2,6 +2,27 @@ import os, torch
 import torch.nn as nn
 from model import Transformer
 
+try:
+    from apex.normalization import FusedLayerNorm
+except ImportError:
+    FusedLayerNorm = None
+
+
+
+def fuse_layernorms(model):
+    if FusedLayerNorm is None:
+        return model
+
+    for module in model.modules():
+        for name, child in module.named_children():
+            if isinstance(child, nn.LayerNorm):
+                fused = FusedLayerNorm(child.normalized_shape, eps=child.eps)
+                fused.weight = child.weight
+                fused.bias = child.bias
+                setattr(module, name, fused)
+
+    return model
+
 
 
 def init_weights(model):
@@ -42,7 +63,18 @@ def load_model(config):
         assert os.path.exists(config.ckpt)
         model_state = torch.load(config.ckpt, map_location=config.device)['model_state_dict']
         model.load_state_dict(model_state)
-        print(f"Trained Model States have loaded from {config.ckpt}")       
-    
+        print(f"Trained Model States have loaded from {config.ckpt}")
+
+    model = fuse_layernorms(model)
     print_model_desc(model)
-    return model.to(config.device)
\ No newline at end of file
+    model = model.to(config.device)
+
+    #let inductor fuse layer_norm + residual adds into single kernels;
+    #on CUDA, reduce-overhead mode also replays the step as a CUDA graph
+    if config.mode in ['train', 'finetune'] and hasattr(model, 'compile'):
+        if config.device_type == 'cuda':
+            model.compile(mode='reduce-overhead')
+        else:
+            model.compile()
+
+    return model
\ No newline at end of file
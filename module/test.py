@@ -47,22 +47,27 @@ class Tester:
     def predict(self, x):
 
         batch_size = x.size(0)
-        pred = torch.zeros((batch_size, self.max_len))
-        pred = pred.type(torch.LongTensor).to(self.device)
+        pred = torch.zeros(
+            (batch_size, self.max_len), dtype=torch.long, device=self.device
+        )
         pred[:, 0] = self.bos_id
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=self.device)
 
+        cache = None
         e_mask = self.model.pad_mask(x)
-        memory = self.model.encoder(x, e_mask)
+        memory = self.model.encode(x, e_mask)
 
         for idx in range(1, self.max_len):
             y = pred[:, :idx]
-            d_out = self.model.decoder(y, memory, e_mask, None)
+            d_out, cache = self.model.decode(y, memory, cache, e_mask, use_cache=True)
 
-            logit = self.model.generator(d_out)
-            pred[:, idx] = logit.argmax(dim=-1)[:, -1]
+            #project only the last position instead of the full sequence
+            logit = self.model.generator(d_out[:, -1])
+            pred[:, idx] = logit.argmax(dim=-1)
 
             #Early Stop Condition
-            if (pred == self.eos_id).sum().item() == batch_size:
+            finished |= pred[:, idx] == self.eos_id
+            if finished.all():
                 break
 
         return pred
@@ -25,7 +25,12 @@ class Trainer:
         self.early_stop = config.early_stop
         self.patience = config.patience
         self.device_type = config.device_type
-        self.scaler = torch.cuda.amp.GradScaler()
+
+        use_bf16 = self.device_type == 'cuda' and torch.cuda.is_bf16_supported()
+        self.amp_dtype = torch.bfloat16 if use_bf16 else torch.float16
+
+        #BF16 keeps FP32 range, so loss scaling is only needed for FP16
+        self.scaler = torch.cuda.amp.GradScaler(enabled=self.amp_dtype == torch.float16)
         self.iters_to_accumulate = config.iters_to_accumulate        
 
         self.optimizer = AdamW(self.model.parameters(), lr=config.lr)
@@ -134,8 +139,8 @@ class Trainer:
             batch = {k: v.to(self.device) for k, v in batch.items()}
             batch['is_generative'] = is_generative
 
-            with torch.autocast(device_type=self.device_type, dtype=torch.float16):
-                loss = self.model(**batch).loss      
+            with torch.autocast(device_type=self.device_type, dtype=self.amp_dtype):
+                loss = self.model(**batch).loss
                 loss = loss / self.iters_to_accumulate
             
             #Backward Loss
@@ -165,7 +170,7 @@ class Trainer:
             for batch in self.valid_dataloader:
                 batch = {k: v.to(self.device) for k, v in batch.items()}
                 
-                with torch.autocast(device_type=self.device_type, dtype=torch.float16):
+                with torch.autocast(device_type=self.device_type, dtype=self.amp_dtype):
                     loss = self.model(**batch).loss
                     epoch_loss += loss.item()
         
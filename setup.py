@@ -10,48 +10,46 @@ from tokenizers.normalizers import NFD, Lowercase, StripAccents
 
 
 def process_data(orig_data, data_volumn):
-    
-    min_len = 10 
+
+    min_len = 10
     max_len = 300
     max_diff = 50
-    volumn_cnt = 0
 
-    corpus, processed = [], []
-    
-    
-    for elem in orig_data:
-        temp_dict = dict()
-        x, y = elem['en'].strip().lower(), elem['de'].strip().lower()
-        x_len, y_len = len(x), len(y)
 
-        #Filtering Conditions
-        min_condition = (x_len >= min_len) & (y_len >= min_len)
-        max_condition = (x_len <= max_len) & (y_len <= max_len)
-        dif_condition = abs(x_len - y_len) < max_diff
+    def normalize(batch):
+        pairs = batch['translation']
+        return {'x': [pair['en'].strip().lower() for pair in pairs],
+                'y': [pair['de'].strip().lower() for pair in pairs]}
+
+
+    #Filtering Conditions
+    def condition(batch):
+        checks = []
+        for x, y in zip(batch['x'], batch['y']):
+            x_len, y_len = len(x), len(y)
+
+            min_condition = (x_len >= min_len) & (y_len >= min_len)
+            max_condition = (x_len <= max_len) & (y_len <= max_len)
+            dif_condition = abs(x_len - y_len) < max_diff
+
+            checks.append(min_condition & max_condition & dif_condition)
+        return checks
 
-        if max_condition & min_condition & dif_condition:
-            corpus.append(x)
-            corpus.append(y)
-            processed.append({'x': x, 'y':y})
-            
-            #End condition
-            volumn_cnt += 1
-            if volumn_cnt == data_volumn:
-                break
 
-    #Save Corpus
-    with open('data/corpus.txt', 'w') as f:
-        f.write('\n'.join(corpus))
+    num_proc = os.cpu_count()
+    processed = orig_data.map(
+        normalize, batched=True, num_proc=num_proc,
+        remove_columns=orig_data.column_names
+    )
+    processed = processed.filter(condition, batched=True, num_proc=num_proc)
+    processed = processed.select(range(min(data_volumn, len(processed))))
 
-    return processed 
+    return processed.to_list()
 
 
 
 
-def train_tokenizer():
-    corpus_path = f'data/corpus.txt'
-    assert os.path.exists(corpus_path)
-    
+def train_tokenizer(data):
     assert os.path.exists('config.yaml')
     with open('config.yaml', 'r') as f:
         vocab_config = yaml.load(f, Loader=yaml.FullLoader)['vocab']
@@ -69,7 +67,9 @@ def train_tokenizer():
             ]
         )
 
-    tokenizer.train(files=[corpus_path], trainer=trainer)
+    #stream both sides of every pair straight into the trainer
+    corpus = (seq for pair in data for seq in (pair['x'], pair['y']))
+    tokenizer.train_from_iterator(corpus, trainer=trainer, length=len(data) * 2)
     tokenizer.save(f"data/tokenizer.json")
 
 
@@ -89,14 +89,14 @@ def save_data(data_obj):
 
 def main():
     #Load Original Data
-    orig_data = load_dataset('wmt14', 'de-en', split='train')['translation']
+    orig_data = load_dataset('wmt14', 'de-en', split='train')
 
     #PreProcess Data
     data_volumn = 55100
     processed_data = process_data(orig_data, data_volumn)
 
     #Train Tokenizer
-    train_tokenizer()
+    train_tokenizer(processed_data)
 
     #Save Data
     save_data(processed_data)